@@ -3,12 +3,15 @@ Convert Ocean_From_Motion.docx into a static HTML book in docs/.
 Handles Word OMML math → LaTeX rendered via KaTeX.
 """
 
+import copy
+import multiprocessing
 import os
 import re
 import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from html import escape
-from docx import Document
-from docx.oxml.ns import qn
+from itertools import chain
 from lxml import etree
 
 DOCX_PATH = os.path.join(os.path.dirname(__file__),
@@ -19,6 +22,11 @@ BASE_URL = "/Ocean-From-Motion"
 MATH_NS = "http://schemas.openxmlformats.org/officeDocument/2006/math"
 WORD_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
 
+# Heading patterns, compiled once — they run against every paragraph
+_SECTION_RE = re.compile(r"^\d+(?:\.\d+)*\.?\s")
+_HEADING_LVL_RE = re.compile(r"^(\d+)(?:\.(\d+))?(?:\.(\d+))?\.")
+_CHAPTER_RE = re.compile(r"Chapter\s+(\d+)")
+
 
 # ── OMML to LaTeX ───────────────────────────────────────────────────
 
@@ -28,6 +36,12 @@ def _mtag(local):
 def _wtag(local):
     return f"{{{WORD_NS}}}{local}"
 
+def _ln(elem):
+    """Local name of an element's tag (rpartition: one C call, no list)."""
+    return elem.tag.rpartition("}")[2]
+
+
+_M_VAL = _mtag("val")  # m:val, the value attribute of every OMML property
 
 # Map common Unicode math chars to LaTeX commands
 UNICODE_TO_LATEX = {
@@ -109,383 +123,617 @@ UNICODE_TO_LATEX = {
 }
 
 
+_ASCII_LETTERS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+_CMD_SUFFIX_RE = re.compile(r'\\[a-zA-Z]+$')
+
+# Characters whose LaTeX replacement ends in a control word like \alpha
+_ENDS_IN_CMD = frozenset(ch for ch, latex in UNICODE_TO_LATEX.items()
+                         if _CMD_SUFFIX_RE.search(latex))
+
+
+def _ends_with_command(s):
+    """True if `s` ends in a LaTeX control word such as \\alpha."""
+    letters = len(s) - len(s.rstrip(_ASCII_LETTERS))
+    return 0 < letters < len(s) and s[-letters - 1] == "\\"
+
+
+# Markers for _latex_escape_text's translate pass. XML 1.0 cannot carry
+# either character, so neither can occur in document text.
+_CMD_MARK = "\x00"    # follows a replacement ending in \command
+_EMPTY_MARK = "\x01"  # stands in for a character that maps to nothing
+
+_LATEX_TABLE = {ord(ch): "\\" + ch for ch in "#$%&_{}"}
+_LATEX_TABLE.update({
+    ord("~"): r"\sim" + _CMD_MARK,
+    ord("^"): r"\hat{}",
+    ord("\\"): r"\backslash" + _CMD_MARK,
+})
+_LATEX_TABLE.update(
+    (ord(ch), latex + _CMD_MARK if ch in _ENDS_IN_CMD else latex or _EMPTY_MARK)
+    for ch, latex in UNICODE_TO_LATEX.items())
+
+
 def _latex_escape_text(text):
     """Escape a text string for LaTeX, converting Unicode math symbols.
     Ensures spacing between LaTeX commands and following letters."""
-    out = []
-    for ch in text:
-        if ch in UNICODE_TO_LATEX:
-            replacement = UNICODE_TO_LATEX[ch]
-            # If previous output ends with \command and this replacement starts
-            # with a letter (or is a letter), add space
-            if out and replacement:
-                prev = out[-1]
-                if re.search(r'\\[a-zA-Z]+$', prev) and replacement[0].isalpha():
-                    out.append(" ")
-            out.append(replacement)
-        elif ch in "#$%&_{}":
-            out.append("\\" + ch)
-        elif ch == "~":
-            out.append(r"\sim")
-        elif ch == "^":
-            out.append(r"\hat{}")
-        elif ch == "\\":
-            out.append(r"\backslash")
-        else:
-            # If previous output ends with \command and this char is a letter
-            if out and ch.isalpha():
-                prev = out[-1]
-                if re.search(r'\\[a-zA-Z]+$', prev):
-                    out.append(" ")
-            out.append(ch)
-    return "".join(out)
+    out = text.translate(_LATEX_TABLE)
+    if _CMD_MARK in out:
+        # A \command followed directly by a letter needs a space. An empty
+        # replacement in between still counts as separating them.
+        head, *tails = out.split(_CMD_MARK)
+        out = head + "".join(" " + t if t[:1].isalpha() else t for t in tails)
+    if _EMPTY_MARK in out:
+        out = out.replace(_EMPTY_MARK, "")
+    return out
 
 
 def _join_latex_parts(parts):
     """Join LaTeX parts, adding spaces where a command would run into a letter."""
+    if len(parts) == 1:
+        # Most containers (e, sub, sup, num, ...) wrap a single child
+        return parts[0]
     result = []
-    for i, part in enumerate(parts):
+    after_cmd = False  # previous part ends in \command
+    for part in parts:
         if not part:
             continue
         # If previous part ends with a backslash-command (letters) and this part
         # starts with a letter, add a space to prevent them from merging.
-        if result:
-            prev = result[-1]
-            # Check if prev ends with \command (letters)
-            if re.search(r'\\[a-zA-Z]+$', prev) and part and part[0].isalpha():
-                result.append(" ")
-            # Also if prev ends with a letter and current starts with a letter
-            # but they are separate OMML elements (subscripts, etc.), add thin space
+        if after_cmd and part[0].isalpha():
+            result.append(" ")
         result.append(part)
+        after_cmd = _ends_with_command(part)
     return "".join(result)
 
 
-def omml_to_latex(elem):
-    """Recursively convert an OMML element to a LaTeX string."""
-    tag = elem.tag.split("}")[-1] if "}" in elem.tag else elem.tag
-
-    if tag == "oMathPara":
-        # Display math paragraph — convert inner oMath
-        parts = []
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "oMath":
-                parts.append(omml_to_latex(child))
-        return "".join(parts)
-
-    if tag == "oMath":
-        parts = [omml_to_latex(c) for c in elem]
-        return _join_latex_parts(parts)
-
-    if tag == "r":
-        # Math run — extract text from m:t
-        text = ""
-        is_normal = False  # roman/normal style
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "t":
-                text += child.text or ""
-            elif ct == "rPr":
-                for prop in child:
-                    pt = prop.tag.split("}")[-1] if "}" in prop.tag else prop.tag
-                    if pt == "sty":
-                        val = prop.get(f"{{{MATH_NS}}}val", "")
-                        if val == "p":  # plain/roman
-                            is_normal = True
-        latex = _latex_escape_text(text)
-        # For plain/roman style: only wrap sequences of 2+ letters in \text{}
-        # to render them upright. Don't wrap operators, LaTeX commands, or symbols.
-        if is_normal and latex.strip():
-            # Check if it's purely alphabetic multi-letter text (like "where", "for")
-            stripped = text.strip()
-            if len(stripped) > 1 and stripped.isalpha():
-                latex = r"\text{" + stripped + "}"
-        return latex
-
-    if tag == "sSub":
-        # Subscript: e_{sub}
-        base = ""
-        sub = ""
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "e":
-                base = omml_to_latex(child)
-            elif ct == "sub":
-                sub = omml_to_latex(child)
-            # skip sSubPr
-        return f"{base}_{{{sub}}}"
-
-    if tag == "sSup":
-        # Superscript: e^{sup}
-        base = ""
-        sup = ""
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "e":
-                base = omml_to_latex(child)
-            elif ct == "sup":
-                sup = omml_to_latex(child)
-        return f"{base}^{{{sup}}}"
-
-    if tag == "sSubSup":
-        # Sub+Superscript: e_{sub}^{sup}
-        base = ""
-        sub = ""
-        sup = ""
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "e":
-                base = omml_to_latex(child)
-            elif ct == "sub":
-                sub = omml_to_latex(child)
-            elif ct == "sup":
-                sup = omml_to_latex(child)
-        return f"{base}_{{{sub}}}^{{{sup}}}"
-
-    if tag == "d":
-        # Delimited group (parentheses, brackets, abs value, etc.)
-        beg_chr = "("
-        end_chr = ")"
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "dPr":
-                for prop in child:
-                    pt = prop.tag.split("}")[-1] if "}" in prop.tag else prop.tag
-                    if pt == "begChr":
-                        beg_chr = prop.get(f"{{{MATH_NS}}}val", "(")
-                    elif pt == "endChr":
-                        end_chr = prop.get(f"{{{MATH_NS}}}val", ")")
-
-        # Map delimiter characters
-        delim_map = {
-            "(": r"\left(", ")": r"\right)",
-            "[": r"\left[", "]": r"\right]",
-            "{": r"\left\{", "}": r"\right\}",
-            "|": r"\left|", "⟨": r"\left\langle", "⟩": r"\right\rangle",
-            "‖": r"\left\|",
-        }
-        beg_latex = delim_map.get(beg_chr, r"\left" + beg_chr)
-        end_latex = delim_map.get(end_chr, r"\right" + end_chr)
-        if end_chr == "|":
-            end_latex = r"\right|"
-        if end_chr == "‖":
-            end_latex = r"\right\|"
-
-        # Collect the e (element) children
-        parts = []
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "e":
-                parts.append(omml_to_latex(child))
-        inner = ", ".join(parts) if len(parts) > 1 else "".join(parts)
-        return f"{beg_latex}{inner}{end_latex}"
-
-    if tag == "f":
-        # Fraction
-        num = ""
-        den = ""
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "num":
-                num = omml_to_latex(child)
-            elif ct == "den":
-                den = omml_to_latex(child)
-        return rf"\frac{{{num}}}{{{den}}}"
-
-    if tag == "nary":
-        # N-ary operator (sum, product, etc.)
-        char = "∑"
-        sub_val = ""
-        sup_val = ""
-        body = ""
-        sup_hide = False
-        sub_hide = False
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "naryPr":
-                for prop in child:
-                    pt = prop.tag.split("}")[-1] if "}" in prop.tag else prop.tag
-                    if pt == "chr":
-                        char = prop.get(f"{{{MATH_NS}}}val", "∑")
-                    elif pt == "supHide":
-                        sup_hide = prop.get(f"{{{MATH_NS}}}val", "0") == "1"
-                    elif pt == "subHide":
-                        sub_hide = prop.get(f"{{{MATH_NS}}}val", "0") == "1"
-            elif ct == "sub":
-                sub_val = omml_to_latex(child)
-            elif ct == "sup":
-                sup_val = omml_to_latex(child)
-            elif ct == "e":
-                body = omml_to_latex(child)
-
-        nary_map = {"∑": r"\sum", "∏": r"\prod", "∫": r"\int",
-                     "∮": r"\oint", "⋃": r"\bigcup", "⋂": r"\bigcap"}
-        op = nary_map.get(char, r"\sum")
-        result = op
-        if sub_val and not sub_hide:
-            result += f"_{{{sub_val}}}"
-        if sup_val and not sup_hide:
-            result += f"^{{{sup_val}}}"
-        result += f" {body}"
-        return result
-
-    if tag == "acc":
-        # Accent (hat, bar, tilde, etc.)
-        char = "\u0302"  # combining circumflex (hat) default
-        body = ""
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "accPr":
-                for prop in child:
-                    pt = prop.tag.split("}")[-1] if "}" in prop.tag else prop.tag
-                    if pt == "chr":
-                        char = prop.get(f"{{{MATH_NS}}}val", "\u0302")
-            elif ct == "e":
-                body = omml_to_latex(child)
-
-        acc_map = {
-            "\u0302": "hat", "\u0300": "grave", "\u0301": "acute",
-            "\u0303": "tilde", "\u0304": "bar", "\u0307": "dot",
-            "\u0308": "ddot", "\u20d7": "vec", "̂": "hat",
-            "̃": "tilde", "̄": "bar", "→": "vec",
-        }
-        cmd = acc_map.get(char, "hat")
-        return rf"\{cmd}{{{body}}}"
-
-    if tag == "rad":
-        # Radical (square root, nth root)
-        deg = ""
-        body = ""
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "deg":
-                deg = omml_to_latex(child)
-            elif ct == "e":
-                body = omml_to_latex(child)
-        if deg.strip():
-            return rf"\sqrt[{deg}]{{{body}}}"
-        return rf"\sqrt{{{body}}}"
-
-    if tag == "limUpp":
-        # Upper limit
-        body = ""
-        lim = ""
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "e":
-                body = omml_to_latex(child)
-            elif ct == "lim":
-                lim = omml_to_latex(child)
-        return rf"\overset{{{lim}}}{{{body}}}"
-
-    if tag == "limLow":
-        # Lower limit
-        body = ""
-        lim = ""
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "e":
-                body = omml_to_latex(child)
-            elif ct == "lim":
-                lim = omml_to_latex(child)
-        return rf"\underset{{{lim}}}{{{body}}}"
-
-    if tag == "func":
-        # Function application (sin, cos, lim, etc.)
-        fname = ""
-        body = ""
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "fName":
-                fname = omml_to_latex(child).strip()
-            elif ct == "e":
-                body = omml_to_latex(child)
-        known_funcs = {"sin", "cos", "tan", "log", "ln", "exp", "lim",
-                       "max", "min", "sup", "inf", "det", "gcd"}
-        if fname.replace("\\mathrm{", "").replace("}", "") in known_funcs:
-            clean = fname.replace("\\mathrm{", "").replace("}", "")
-            return rf"\{clean} {body}"
-        return rf"\operatorname{{{fname}}} {body}"
-
-    if tag == "eqArr":
-        # Equation array
-        lines = []
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "e":
-                lines.append(omml_to_latex(child))
-        return r" \\ ".join(lines)
-
-    if tag == "groupChr":
-        # Group character (underbrace, overbrace)
-        body = ""
-        char = "⏟"
-        pos = "bot"
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "groupChrPr":
-                for prop in child:
-                    pt = prop.tag.split("}")[-1] if "}" in prop.tag else prop.tag
-                    if pt == "chr":
-                        char = prop.get(f"{{{MATH_NS}}}val", "⏟")
-                    elif pt == "pos":
-                        pos = prop.get(f"{{{MATH_NS}}}val", "bot")
-            elif ct == "e":
-                body = omml_to_latex(child)
-        if pos == "top" or char == "⏞":
-            return rf"\overbrace{{{body}}}"
-        return rf"\underbrace{{{body}}}"
-
-    if tag == "m":
-        # Matrix
-        rows = []
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "mr":
-                cols = []
-                for mc in child:
-                    mct = mc.tag.split("}")[-1] if "}" in mc.tag else mc.tag
-                    if mct == "e":
-                        cols.append(omml_to_latex(mc))
-                rows.append(" & ".join(cols))
-        return r"\begin{pmatrix} " + r" \\ ".join(rows) + r" \end{pmatrix}"
-
-    if tag == "box":
-        body = ""
-        for child in elem:
-            ct = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-            if ct == "e":
-                body = omml_to_latex(child)
-        return body
-
-    # Container elements: e, num, den, sub, sup, deg, lim, fName
-    if tag in ("e", "num", "den", "sub", "sup", "deg", "lim", "fName",
-               "oMathParaPr", "ctrlPr", "sSubPr", "sSupPr", "sSubSupPr",
-               "dPr", "fPr", "naryPr", "accPr", "radPr", "funcPr",
-               "eqArrPr", "groupChrPr", "mPr", "boxPr", "limUppPr", "limLowPr",
-               "rPr"):
-        if tag in ("e", "num", "den", "sub", "sup", "deg", "lim", "fName"):
-            parts = [omml_to_latex(c) for c in elem]
-            return _join_latex_parts(parts)
-        return ""  # properties — skip
-
-    # Fallback: recurse
-    parts = [omml_to_latex(c) for c in elem]
+def omml_to_latex(root):
+    """Convert an OMML element to a LaTeX string.
+
+    Walks the tree post-order with an explicit stack rather than recursing:
+    each element's handler is called with the element and the LaTeX of its
+    children, in document order. Runs and property elements are leaves,
+    converted as soon as their parent is reached; they never go on the stack.
+    """
+    tag = _ln(root)
+    handler = _OMML_HANDLERS.get(tag, _omml_container)
+    if tag in _OMML_LEAVES:
+        return handler(root, ())
+    results = []
+    stack = [(root, handler, None)]
+    while stack:
+        elem, handler, parts = stack.pop()
+        if parts is None:
+            # First visit: convert leaf children now, leave a None slot for
+            # each of the others and push them
+            parts = []
+            pending = []
+            for child in elem:
+                tag = _ln(child)
+                child_handler = _OMML_HANDLERS.get(tag, _omml_container)
+                if tag in _OMML_LEAVES:
+                    parts.append(child_handler(child, ()))
+                else:
+                    parts.append(None)
+                    pending.append((child, child_handler, None))
+            if pending:
+                stack.append((elem, handler, parts))
+                pending.reverse()
+                stack.extend(pending)
+                continue
+        else:
+            # Children done: their LaTeX is on top of results, in order
+            split = len(results) - parts.count(None)
+            done = iter(results[split:])
+            del results[split:]
+            parts = [next(done) if p is None else p for p in parts]
+        results.append(handler(elem, parts))
+    return results[0]
+
+
+def _omml_container(elem, parts):
+    # Container elements (e, num, den, sub, sup, deg, lim, fName) and any
+    # unknown tag: join the converted children
     return _join_latex_parts(parts)
 
 
+def _omml_property(elem, parts):
+    return ""  # properties — skip
+
+
+def _omml_math_para(elem, parts):
+    # Display math paragraph — keep the inner oMath
+    return "".join(latex for child, latex in zip(elem, parts)
+                   if _ln(child) == "oMath")
+
+
+def _omml_run(elem, parts):
+    # Math run — extract text from m:t
+    text = ""
+    is_normal = False  # roman/normal style
+    for child in elem:
+        ct = _ln(child)
+        if ct == "t":
+            text += child.text or ""
+        elif ct == "rPr":
+            for prop in child:
+                if _ln(prop) == "sty":
+                    val = prop.get(_M_VAL, "")
+                    if val == "p":  # plain/roman
+                        is_normal = True
+    key = (text, is_normal)
+    latex = _RUN_LATEX_CACHE.get(key)
+    if latex is None:
+        latex = _RUN_LATEX_CACHE[key] = _run_latex(text, is_normal)
+    return latex
+
+
+# (run text, is_normal) -> LaTeX. Math runs repeat heavily (single
+# variables, commas, '='): the book's 1391 runs have only 210 distinct keys.
+_RUN_LATEX_CACHE = {}
+
+
+def _run_latex(text, is_normal):
+    """LaTeX for a math run's text; a pure function, so _omml_run caches it."""
+    latex = _latex_escape_text(text)
+    # For plain/roman style: only wrap sequences of 2+ letters in \text{}
+    # to render them upright. Don't wrap operators, LaTeX commands, or symbols.
+    if is_normal and latex.strip():
+        # Check if it's purely alphabetic multi-letter text (like "where", "for")
+        stripped = text.strip()
+        if len(stripped) > 1 and stripped.isalpha():
+            latex = r"\text{" + stripped + "}"
+    return latex
+
+
+def _omml_sub(elem, parts):
+    # Subscript: e_{sub}
+    base = ""
+    sub = ""
+    for child, latex in zip(elem, parts):
+        ct = _ln(child)
+        if ct == "e":
+            base = latex
+        elif ct == "sub":
+            sub = latex
+        # skip sSubPr
+    return f"{base}_{{{sub}}}"
+
+
+def _omml_sup(elem, parts):
+    # Superscript: e^{sup}
+    base = ""
+    sup = ""
+    for child, latex in zip(elem, parts):
+        ct = _ln(child)
+        if ct == "e":
+            base = latex
+        elif ct == "sup":
+            sup = latex
+    return f"{base}^{{{sup}}}"
+
+
+def _omml_sub_sup(elem, parts):
+    # Sub+Superscript: e_{sub}^{sup}
+    base = ""
+    sub = ""
+    sup = ""
+    for child, latex in zip(elem, parts):
+        ct = _ln(child)
+        if ct == "e":
+            base = latex
+        elif ct == "sub":
+            sub = latex
+        elif ct == "sup":
+            sup = latex
+    return f"{base}_{{{sub}}}^{{{sup}}}"
+
+
+# Delimiter character -> sized LaTeX delimiter
+_DELIM_LATEX = {
+    "(": r"\left(", ")": r"\right)",
+    "[": r"\left[", "]": r"\right]",
+    "{": r"\left\{", "}": r"\right\}",
+    "|": r"\left|", "⟨": r"\left\langle", "⟩": r"\right\rangle",
+    "‖": r"\left\|",
+}
+
+
+def _omml_delim(elem, parts):
+    # Delimited group (parentheses, brackets, abs value, etc.)
+    beg_chr = "("
+    end_chr = ")"
+    items = []
+    for child, latex in zip(elem, parts):
+        ct = _ln(child)
+        if ct == "dPr":
+            for prop in child:
+                pt = _ln(prop)
+                if pt == "begChr":
+                    beg_chr = prop.get(_M_VAL, "(")
+                elif pt == "endChr":
+                    end_chr = prop.get(_M_VAL, ")")
+        elif ct == "e":
+            # Collect the e (element) children
+            items.append(latex)
+
+    beg_latex = _DELIM_LATEX.get(beg_chr, r"\left" + beg_chr)
+    end_latex = _DELIM_LATEX.get(end_chr, r"\right" + end_chr)
+    if end_chr == "|":
+        end_latex = r"\right|"
+    if end_chr == "‖":
+        end_latex = r"\right\|"
+
+    inner = ", ".join(items) if len(items) > 1 else "".join(items)
+    return f"{beg_latex}{inner}{end_latex}"
+
+
+def _omml_frac(elem, parts):
+    # Fraction
+    num = ""
+    den = ""
+    for child, latex in zip(elem, parts):
+        ct = _ln(child)
+        if ct == "num":
+            num = latex
+        elif ct == "den":
+            den = latex
+    return rf"\frac{{{num}}}{{{den}}}"
+
+
+# N-ary operator character -> LaTeX command
+_NARY_LATEX = {"∑": r"\sum", "∏": r"\prod", "∫": r"\int",
+               "∮": r"\oint", "⋃": r"\bigcup", "⋂": r"\bigcap"}
+
+
+def _omml_nary(elem, parts):
+    # N-ary operator (sum, product, etc.)
+    char = "∑"
+    sub_val = ""
+    sup_val = ""
+    body = ""
+    sup_hide = False
+    sub_hide = False
+    for child, latex in zip(elem, parts):
+        ct = _ln(child)
+        if ct == "naryPr":
+            for prop in child:
+                pt = _ln(prop)
+                if pt == "chr":
+                    char = prop.get(_M_VAL, "∑")
+                elif pt == "supHide":
+                    sup_hide = prop.get(_M_VAL, "0") == "1"
+                elif pt == "subHide":
+                    sub_hide = prop.get(_M_VAL, "0") == "1"
+        elif ct == "sub":
+            sub_val = latex
+        elif ct == "sup":
+            sup_val = latex
+        elif ct == "e":
+            body = latex
+
+    op = _NARY_LATEX.get(char, r"\sum")
+    result = op
+    if sub_val and not sub_hide:
+        result += f"_{{{sub_val}}}"
+    if sup_val and not sup_hide:
+        result += f"^{{{sup_val}}}"
+    result += f" {body}"
+    return result
+
+
+# Accent character (combining or spacing) -> LaTeX accent command name
+_ACCENT_CMDS = {
+    "\u0302": "hat", "\u0300": "grave", "\u0301": "acute",
+    "\u0303": "tilde", "\u0304": "bar", "\u0307": "dot",
+    "\u0308": "ddot", "\u20d7": "vec", "̂": "hat",
+    "̃": "tilde", "̄": "bar", "→": "vec",
+}
+
+
+def _omml_accent(elem, parts):
+    # Accent (hat, bar, tilde, etc.)
+    char = "\u0302"  # combining circumflex (hat) default
+    body = ""
+    for child, latex in zip(elem, parts):
+        ct = _ln(child)
+        if ct == "accPr":
+            for prop in child:
+                if _ln(prop) == "chr":
+                    char = prop.get(_M_VAL, "\u0302")
+        elif ct == "e":
+            body = latex
+
+    cmd = _ACCENT_CMDS.get(char, "hat")
+    return rf"\{cmd}{{{body}}}"
+
+
+def _omml_radical(elem, parts):
+    # Radical (square root, nth root)
+    deg = ""
+    body = ""
+    for child, latex in zip(elem, parts):
+        ct = _ln(child)
+        if ct == "deg":
+            deg = latex
+        elif ct == "e":
+            body = latex
+    if deg.strip():
+        return rf"\sqrt[{deg}]{{{body}}}"
+    return rf"\sqrt{{{body}}}"
+
+
+def _omml_lim_upp(elem, parts):
+    # Upper limit
+    body = ""
+    lim = ""
+    for child, latex in zip(elem, parts):
+        ct = _ln(child)
+        if ct == "e":
+            body = latex
+        elif ct == "lim":
+            lim = latex
+    return rf"\overset{{{lim}}}{{{body}}}"
+
+
+def _omml_lim_low(elem, parts):
+    # Lower limit
+    body = ""
+    lim = ""
+    for child, latex in zip(elem, parts):
+        ct = _ln(child)
+        if ct == "e":
+            body = latex
+        elif ct == "lim":
+            lim = latex
+    return rf"\underset{{{lim}}}{{{body}}}"
+
+
+# Function names KaTeX has a dedicated command for (\sin, \lim, ...)
+_KNOWN_FUNCS = frozenset({"sin", "cos", "tan", "log", "ln", "exp", "lim",
+                          "max", "min", "sup", "inf", "det", "gcd"})
+
+
+def _omml_func(elem, parts):
+    # Function application (sin, cos, lim, etc.)
+    fname = ""
+    body = ""
+    for child, latex in zip(elem, parts):
+        ct = _ln(child)
+        if ct == "fName":
+            fname = latex.strip()
+        elif ct == "e":
+            body = latex
+    clean = fname.replace("\\mathrm{", "").replace("}", "")
+    if clean in _KNOWN_FUNCS:
+        return rf"\{clean} {body}"
+    return rf"\operatorname{{{fname}}} {body}"
+
+
+def _omml_eq_arr(elem, parts):
+    # Equation array
+    lines = [latex for child, latex in zip(elem, parts) if _ln(child) == "e"]
+    return r" \\ ".join(lines)
+
+
+def _omml_group_chr(elem, parts):
+    # Group character (underbrace, overbrace)
+    body = ""
+    char = "⏟"
+    pos = "bot"
+    for child, latex in zip(elem, parts):
+        ct = _ln(child)
+        if ct == "groupChrPr":
+            for prop in child:
+                pt = _ln(prop)
+                if pt == "chr":
+                    char = prop.get(_M_VAL, "⏟")
+                elif pt == "pos":
+                    pos = prop.get(_M_VAL, "bot")
+        elif ct == "e":
+            body = latex
+    if pos == "top" or char == "⏞":
+        return rf"\overbrace{{{body}}}"
+    return rf"\underbrace{{{body}}}"
+
+
+def _omml_matrix(elem, parts):
+    # Matrix — rows arrive already joined by _omml_matrix_row
+    rows = [latex for child, latex in zip(elem, parts) if _ln(child) == "mr"]
+    return r"\begin{pmatrix} " + r" \\ ".join(rows) + r" \end{pmatrix}"
+
+
+def _omml_matrix_row(elem, parts):
+    # Matrix row: its e cells joined with &
+    return " & ".join(latex for child, latex in zip(elem, parts)
+                      if _ln(child) == "e")
+
+
+def _omml_box(elem, parts):
+    body = ""
+    for child, latex in zip(elem, parts):
+        if _ln(child) == "e":
+            body = latex
+    return body
+
+
+# OMML local tag name -> converter; anything unlisted converts as a container
+_OMML_HANDLERS = {
+    "oMathPara": _omml_math_para,
+    "oMath": _omml_container,
+    "r": _omml_run,
+    "sSub": _omml_sub,
+    "sSup": _omml_sup,
+    "sSubSup": _omml_sub_sup,
+    "d": _omml_delim,
+    "f": _omml_frac,
+    "nary": _omml_nary,
+    "acc": _omml_accent,
+    "rad": _omml_radical,
+    "limUpp": _omml_lim_upp,
+    "limLow": _omml_lim_low,
+    "func": _omml_func,
+    "eqArr": _omml_eq_arr,
+    "groupChr": _omml_group_chr,
+    "m": _omml_matrix,
+    "mr": _omml_matrix_row,
+    "box": _omml_box,
+}
+_OMML_HANDLERS.update(dict.fromkeys(
+    ("oMathParaPr", "ctrlPr", "sSubPr", "sSupPr", "sSubSupPr", "dPr", "fPr",
+     "naryPr", "accPr", "radPr", "funcPr", "eqArrPr", "groupChrPr", "mPr",
+     "boxPr", "limUppPr", "limLowPr", "rPr"),
+    _omml_property))
+# Tags whose handlers read the element directly; the walker never descends
+# into them
+_OMML_LEAVES = frozenset(
+    tag for tag, handler in _OMML_HANDLERS.items()
+    if handler in (_omml_run, _omml_property))
+
+
+# ── WordprocessingML reading ────────────────────────────────────────
+
+# Fully qualified tags, so lxml can filter children in C
+P_TAG = _wtag("p")
+TBL_TAG = _wtag("tbl")
+_W_R = _wtag("r")
+_W_T = _wtag("t")
+_W_RPR = _wtag("rPr")
+_W_HYPERLINK = _wtag("hyperlink")
+_W_TR = _wtag("tr")
+_W_TC = _wtag("tc")
+_W_TCPR = _wtag("tcPr")
+_W_TRPR = _wtag("trPr")
+_W_GRIDBEFORE = _wtag("gridBefore")
+_W_GRIDSPAN = _wtag("gridSpan")
+_W_VMERGE = _wtag("vMerge")
+_W_VAL = _wtag("val")
+_W_B = _wtag("b")
+_W_I = _wtag("i")
+_W_BR = _wtag("br")
+_W_TYPE = _wtag("type")
+_W_BODY = _wtag("body")
+_W_STYLE = _wtag("style")
+_W_NAME = _wtag("name")
+_W_STYLEID = _wtag("styleId")
+_W_DEFAULT = _wtag("default")
+
+# Same parser settings python-docx uses, so text nodes come out identical
+_XML_PARSER = etree.XMLParser(remove_blank_text=True, resolve_entities=False)
+
+# A paragraph's style id; one compiled XPath beats chained find() calls
+_STYLE_XP = etree.XPath("./w:pPr/w:pStyle/@w:val", namespaces={"w": WORD_NS})
+
+# Text equivalents of the non-<w:t> run content elements
+_RUN_CHAR = {
+    _wtag("tab"): "\t",
+    _wtag("ptab"): "\t",
+    _wtag("cr"): "\n",
+    _wtag("noBreakHyphen"): "-",
+}
+
+# Built-in style names Word stores in lower case (as python-docx maps them)
+_STYLE_UI_NAMES = {"caption": "Caption", "footer": "Footer", "header": "Header"}
+_STYLE_UI_NAMES.update({f"heading {n}": f"Heading {n}" for n in range(1, 10)})
+
+
+def _on_off(elem):
+    """Value of a w:b / w:i style toggle; a missing w:val means on."""
+    val = elem.get(_W_VAL)
+    return val is None or val in ("1", "true", "on")
+
+
+def run_text(r):
+    """Text of a <w:r>, with tabs and line breaks as characters."""
+    parts = []
+    for child in r:
+        tag = child.tag
+        if tag == _W_T:
+            parts.append(child.text or "")
+        elif tag == _W_BR:
+            # Page and column breaks have no text equivalent
+            if child.get(_W_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag in _RUN_CHAR:
+            parts.append(_RUN_CHAR[tag])
+    return "".join(parts)
+
+
+def run_format(r):
+    """(bold, italic) directly applied to a <w:r>."""
+    rpr = r.find(_W_RPR)
+    if rpr is None:
+        return False, False
+    b = rpr.find(_W_B)
+    i = rpr.find(_W_I)
+    return (b is not None and _on_off(b)), (i is not None and _on_off(i))
+
+
+def paragraph_text(p):
+    """Visible text of a <w:p>, including runs inside hyperlinks."""
+    parts = []
+    for child in p.iterchildren(_W_R, _W_HYPERLINK):
+        if child.tag == _W_R:
+            parts.append(run_text(child))
+        else:
+            parts.extend(run_text(r) for r in child.iterchildren(_W_R))
+    return "".join(parts)
+
+
+def load_style_names(styles_root):
+    """Map paragraph style ids to display names from word/styles.xml.
+    Returns (names, default_name)."""
+    names = {}
+    default_name = ""
+    for style in styles_root.iterchildren(_W_STYLE):
+        if style.get(_W_TYPE) != "paragraph":
+            continue
+        name_elem = style.find(_W_NAME)
+        name = name_elem.get(_W_VAL, "") if name_elem is not None else ""
+        name = _STYLE_UI_NAMES.get(name, name)
+        names.setdefault(style.get(_W_STYLEID), name)
+        if style.get(_W_DEFAULT) in ("1", "true", "on"):
+            default_name = name
+    return names, default_name
+
+
+def paragraph_style_name(p, style_names, default_name):
+    """Display name of a <w:p>'s paragraph style."""
+    style_id = _STYLE_XP(p)
+    if not style_id or not style_id[0]:
+        return default_name
+    return style_names.get(style_id[0], default_name)
+
+
 # ── Paragraph to HTML (with math) ──────────────────────────────────
 
-def _para_xml_to_html(para_elem, paragraph):
+def _escape(text):
+    """html.escape(), skipping its five replace passes when nothing in
+    `text` needs escaping (nearly every run of prose)."""
+    if "&" in text or "<" in text or ">" in text or '"' in text or "'" in text:
+        return escape(text)
+    return text
+
+
+# Inline wrapper for a run's escaped text, keyed by (bold, italic)
+_RUN_WRAP = {
+    (False, False): "{}",
+    (True, False): "<strong>{}</strong>",
+    (False, True): "<em>{}</em>",
+    (True, True): "<strong><em>{}</em></strong>",
+}
+
+
+def _para_xml_to_html(children):
     """
-    Walk the paragraph's XML directly to interleave text runs and math.
+    Walk a paragraph's child elements directly to interleave text runs and
+    math. Only runs and math matter; anything else may be left out.
     Returns an HTML string with inline LaTeX \\(...\\) or display \\[...\\].
     """
     parts = []
     has_display_math = False
 
-    for child in para_elem:
-        tag = child.tag.split("}")[-1] if "}" in child.tag else child.tag
+    for child in children:
+        tag = _ln(child)
 
         if tag == "r":
             # Regular word run
@@ -493,27 +741,20 @@ def _para_xml_to_html(para_elem, paragraph):
             bold = False
             italic = False
             for rc in child:
-                rt = rc.tag.split("}")[-1] if "}" in rc.tag else rc.tag
+                rt = _ln(rc)
                 if rt == "t":
                     text += rc.text or ""
                 elif rt == "rPr":
                     for rp in rc:
-                        rpt = rp.tag.split("}")[-1] if "}" in rp.tag else rp.tag
+                        rpt = _ln(rp)
                         if rpt == "b":
-                            val = rp.get(f"{{{WORD_NS}}}val", "true")
+                            val = rp.get(_W_VAL, "true")
                             bold = val != "false" and val != "0"
                         elif rpt == "i":
-                            val = rp.get(f"{{{WORD_NS}}}val", "true")
+                            val = rp.get(_W_VAL, "true")
                             italic = val != "false" and val != "0"
             if text:
-                t = escape(text)
-                if bold and italic:
-                    t = f"<strong><em>{t}</em></strong>"
-                elif bold:
-                    t = f"<strong>{t}</strong>"
-                elif italic:
-                    t = f"<em>{t}</em>"
-                parts.append(t)
+                parts.append(_RUN_WRAP[bold, italic].format(_escape(text)))
 
         elif tag == "oMathPara":
             # Display math block
@@ -532,69 +773,97 @@ def _para_xml_to_html(para_elem, paragraph):
     return content, has_display_math
 
 
-def runs_to_html(paragraph):
-    """Convert a paragraph's runs into HTML, preserving bold/italic."""
-    parts = []
-    for run in paragraph.runs:
-        text = escape(run.text)
-        if not text:
-            continue
-        if run.bold and run.italic:
-            text = f"<strong><em>{text}</em></strong>"
-        elif run.bold:
-            text = f"<strong>{text}</strong>"
-        elif run.italic:
-            text = f"<em>{text}</em>"
-        parts.append(text)
-    return "".join(parts) or escape(paragraph.text)
-
-
-def paragraph_to_html(paragraph):
-    """Convert a paragraph to HTML, handling math if present."""
-    para_elem = paragraph._element
-    has_math = any(
-        (MATH_NS in c.tag) for c in para_elem
-    )
-
-    if has_math:
-        content, is_display = _para_xml_to_html(para_elem, paragraph)
-        return content, is_display
-    else:
-        return runs_to_html(paragraph), False
+def runs_to_html(paragraph, text, runs=None):
+    """Convert a <w:p>'s runs into HTML, preserving bold/italic.
+    `text` is the paragraph's cached full text, used when no run has any.
+    `runs` are its <w:r> children, when the caller already has them."""
+    if runs is None:
+        runs = paragraph.iterchildren(_W_R)
+    return "".join(
+        _RUN_WRAP[run_format(r)].format(_escape(t))
+        for r in runs if (t := run_text(r))
+    ) or _escape(text)
+
+
+def paragraph_to_html(paragraph, text):
+    """Convert a <w:p> to HTML, handling math if present."""
+    # One pass over the children: collect runs until math turns up, then
+    # hand the math walker what we have plus the rest of the iterator
+    runs = []
+    children = iter(paragraph)
+    for child in children:
+        tag = child.tag
+        if tag == _W_R:
+            runs.append(child)
+        elif MATH_NS in tag:
+            return _para_xml_to_html(chain(runs, (child,), children))
+    return runs_to_html(paragraph, text, runs), False
 
 
 # ── Other helpers ───────────────────────────────────────────────────
 
+def _grid_attr(props, tag, default):
+    """Integer w:val of a table/row/cell property child, or `default`."""
+    if props is None:
+        return default
+    elem = props.find(tag)
+    return int(elem.get(_W_VAL, default)) if elem is not None else default
+
+
 def table_to_html(table):
-    """Convert a docx table to an HTML <table>."""
+    """Convert a <w:tbl> to an HTML <table>.
+    Horizontally spanned cells repeat per grid column and vertically merged
+    cells repeat the text of the cell above, so every row stays full width."""
     rows_html = []
-    for ri, row in enumerate(table.rows):
+    above = {}  # grid column -> cell text in the previous row
+    for ri, tr in enumerate(table.iterchildren(_W_TR)):
         cells = []
         tag = "th" if ri == 0 else "td"
-        for cell in row.cells:
-            cells.append(f"<{tag}>{escape(cell.text)}</{tag}>")
+        row = {}
+        col = _grid_attr(tr.find(_W_TRPR), _W_GRIDBEFORE, 0)
+        for tc in tr.iterchildren(_W_TC):
+            tcpr = tc.find(_W_TCPR)
+            span = _grid_attr(tcpr, _W_GRIDSPAN, 1)
+            vmerge = tcpr.find(_W_VMERGE) if tcpr is not None else None
+            if vmerge is not None and vmerge.get(_W_VAL, "continue") == "continue":
+                text = above.get(col, "")
+            else:
+                text = "\n".join(paragraph_text(p) for p in tc.iterchildren(P_TAG))
+            cell = f"<{tag}>{_escape(text)}</{tag}>"
+            for _ in range(span):
+                row[col] = text
+                cells.append(cell)
+                col += 1
+        above = row
         rows_html.append("<tr>" + "".join(cells) + "</tr>")
     return "<table>\n" + "\n".join(rows_html) + "\n</table>"
 
 
-def is_section_heading(paragraph):
-    """Detect numbered sub-section headings like '4.1 Title' in Body Text."""
-    text = paragraph.text.strip()
+def is_section_heading(paragraph, text, style_name):
+    """Detect numbered sub-section headings like '4.1 Title' in Body Text.
+    `text` is the paragraph's stripped text."""
     if not text:
         return False
-    if re.match(r"^\d+(\.\d+)*\.?\s", text):
-        if paragraph.runs and all(r.bold for r in paragraph.runs if r.text.strip()):
-            return True
-        if paragraph.style.name == "Body Text":
-            return True
-    return False
+    if not _SECTION_RE.match(text):
+        return False
+    if style_name == "Body Text":
+        return True
+    # Otherwise every run with visible text must be bold
+    has_runs = False
+    for r in paragraph.iterchildren(_W_R):
+        has_runs = True
+        t = run_text(r)
+        if t and not t.isspace() and not run_format(r)[0]:
+            return False
+    return has_runs
 
 
 def classify_heading_level(text):
-    """Determine h2/h3/h4 level from numbered heading text."""
-    m = re.match(r"^(\d+)(?:\.(\d+))?(?:\.(\d+))?\.", text.strip())
-    if not m:
-        m = re.match(r"^(\d+)(?:\.(\d+))?(?:\.(\d+))?\s", text.strip())
+    """Determine h2/h3/h4 level from numbered heading text (already
+    stripped, as is_section_heading received it)."""
+    # A whitespace-terminated fallback could only ever yield h2 (any dotted
+    # number already matches here), so a single pattern suffices.
+    m = _HEADING_LVL_RE.match(text)
     if m:
         if m.group(3):
             return "h4"
@@ -605,156 +874,165 @@ def classify_heading_level(text):
 
 # ── Document parsing ────────────────────────────────────────────────
 
-def parse_document(doc):
-    """Walk the document body, producing ('paragraph', para) or ('table', table)."""
-    para_map = {id(p._element): p for p in doc.paragraphs}
-    table_map = {id(t._element): t for t in doc.tables}
+def parse_document(docx_path):
+    """Read the .docx body straight from its XML, producing
+    ('paragraph', p, text, style_name) or ('table', tbl, None, None),
+    where p and tbl are the lxml <w:p> / <w:tbl> elements."""
+    with zipfile.ZipFile(docx_path) as zf:
+        document = etree.fromstring(zf.read("word/document.xml"), _XML_PARSER)
+        styles = etree.fromstring(zf.read("word/styles.xml"), _XML_PARSER)
+    style_names, default_style = load_style_names(styles)
 
     elements = []
-    body = doc.element.body
-    for child in body:
-        tag = child.tag.split("}")[-1] if "}" in child.tag else child.tag
-        if tag == "p":
-            p = para_map.get(id(child))
-            if p:
-                elements.append(("paragraph", p))
-        elif tag == "tbl":
-            t = table_map.get(id(child))
-            if t:
-                elements.append(("table", t))
+    body = document.find(_W_BODY)
+    for child in body.iterchildren(P_TAG, TBL_TAG):
+        if child.tag == P_TAG:
+            style_name = paragraph_style_name(child, style_names, default_style)
+            elements.append(("paragraph", child, paragraph_text(child), style_name))
+        else:
+            elements.append(("table", child, None, None))
     return elements
 
 
 def split_into_sections(elements):
-    """Split elements into preface, chapters, and appendices."""
-    sections = {}
+    """Split elements into preface, chapters, and appendices.
 
+    Returns (preface, chapters, appendix_a, appendix_b), where chapters is
+    a list indexed by chapter number. Chapters and appendices that were
+    not found are None.
+    """
+    # One pass over the body collects every structural boundary
     para_idx = 0
-    elem_indices = {}
-    for ei, (etype, obj) in enumerate(elements):
-        if etype == "paragraph":
-            elem_indices[para_idx] = ei
-            para_idx += 1
-
-    heading1_indices = []
-    para_idx = 0
-    for ei, (etype, obj) in enumerate(elements):
-        if etype == "paragraph":
-            if obj.style.name.startswith("Heading"):
-                heading1_indices.append((para_idx, ei, obj.text))
-            para_idx += 1
-
-    preface_start = elem_indices.get(77, 0)
-    preface_end = elem_indices.get(92, 0)
-    sections["preface"] = elements[preface_start:preface_end]
-
-    chapter_starts = []
-    current_part = None
-    for para_idx_val, ei, text in heading1_indices:
-        text_stripped = text.strip()
-        if text_stripped.startswith("PART"):
-            current_part = text_stripped
-            continue
-        m = re.match(r"Chapter\s+(\d+)", text_stripped)
-        if m:
-            ch_num = int(m.group(1))
-            chapter_starts.append((ei, ch_num))
-
-    for idx, (ei, ch_num) in enumerate(chapter_starts):
-        if idx + 1 < len(chapter_starts):
-            next_ei = chapter_starts[idx + 1][0]
-            end_ei = next_ei
-            for pi, pei, ptext in heading1_indices:
-                if pei == next_ei - 1 and ptext.strip().startswith("PART"):
-                    end_ei = pei
-                    break
-            sections[f"chapter-{ch_num}"] = elements[ei:end_ei]
-        else:
-            app_a_ei = None
-            for eei, (etype, obj) in enumerate(elements):
-                if etype == "paragraph" and obj.text.strip() == "APPENDIX A":
-                    app_a_ei = eei
-                    break
-            if app_a_ei:
-                sections[f"chapter-{ch_num}"] = elements[ei:app_a_ei]
-            else:
-                sections[f"chapter-{ch_num}"] = elements[ei:]
-
+    preface_start = 0   # element index of paragraph 77
+    preface_end = 0     # element index of paragraph 92
+    chapter_starts = []  # (element index, chapter number)
+    part_eis = set()     # element indices of PART headings
     app_a_ei = None
     app_b_ei = None
-    for eei, (etype, obj) in enumerate(elements):
-        if etype == "paragraph":
-            if obj.text.strip() == "APPENDIX A":
-                app_a_ei = eei
-            elif obj.text.strip() == "APPENDIX B":
-                app_b_ei = eei
+    for ei, (etype, obj, text, style_name) in enumerate(elements):
+        if etype != "paragraph":
+            continue
+        if para_idx == 77:
+            preface_start = ei
+        elif para_idx == 92:
+            preface_end = ei
+        text = text.strip()
+        if style_name.startswith("Heading"):
+            if text.startswith("PART"):
+                part_eis.add(ei)
+            elif m := _CHAPTER_RE.match(text):
+                chapter_starts.append((ei, int(m.group(1))))
+        if text.startswith("APPENDIX"):
+            if text == "APPENDIX A":
+                app_a_ei = ei
+            elif text == "APPENDIX B":
+                app_b_ei = ei
+        para_idx += 1
+
+    preface = elements[preface_start:preface_end]
+    chapters = [None] * len(CHAPTER_TITLES)
+
+    # A chapter runs to the next chapter's start, less a PART heading just
+    # before it; the last one runs to Appendix A (or the end)
+    next_starts = [ei for ei, _ in chapter_starts[1:]] + [None]
+    for (ei, ch_num), next_ei in zip(chapter_starts, next_starts):
+        if ch_num >= len(chapters):
+            continue
+        if next_ei is None:
+            end_ei = app_a_ei or None
+        elif next_ei - 1 in part_eis:
+            end_ei = next_ei - 1
+        else:
+            end_ei = next_ei
+        chapters[ch_num] = elements[ei:end_ei]
 
+    appendix_a = None
+    appendix_b = None
     if app_a_ei and app_b_ei:
-        sections["appendix-a"] = elements[app_a_ei:app_b_ei]
+        appendix_a = elements[app_a_ei:app_b_ei]
     elif app_a_ei:
-        sections["appendix-a"] = elements[app_a_ei:]
+        appendix_a = elements[app_a_ei:]
     if app_b_ei:
-        sections["appendix-b"] = elements[app_b_ei:]
+        appendix_b = elements[app_b_ei:]
 
-    return sections
+    return preface, chapters, appendix_a, appendix_b
 
 
-def para_has_content(paragraph):
-    """Check if paragraph has any visible text or math."""
-    if paragraph.text.strip():
+def para_has_content(paragraph, text):
+    """Check if paragraph has any visible text or math.
+    `text` is the paragraph's stripped text."""
+    if text:
         return True
     # Check for math elements
-    return any(MATH_NS in c.tag for c in paragraph._element)
+    return any(MATH_NS in c.tag for c in paragraph)
 
 
-def section_to_html(section_elements, skip_count=0):
-    """Convert a list of (type, obj) elements into HTML body content."""
-    html_parts = []
+# Paragraph prefixes rendered as list items
+_BULLET_PREFIXES = ("\u2022", "- ")
+
+# classify_heading_level() result -> bytes template for the heading
+_HEADING_HTML = {
+    "h2": b"<h2>%b</h2>", "h3": b"<h3>%b</h3>", "h4": b"<h4>%b</h4>",
+}
+
+
+def section_to_html(section_elements, write, skip_count=0):
+    """Convert a list of (type, obj, text, style_name) elements into HTML
+    body content, passing each block-level fragment to `write` in order as
+    UTF-8 bytes (fixed markup is bytes already; only content is encoded).
+    Returns (has_math, subtitle): whether any of it needs math rendering,
+    and the stripped text of the first non-heading paragraph with content
+    (skipped or not), or None."""
     skipped = 0
     has_math = False
+    subtitle = None
 
-    for etype, obj in section_elements:
+    for etype, obj, text, style_name in section_elements:
         if etype == "table":
-            html_parts.append(table_to_html(obj))
+            write(table_to_html(obj).encode("utf-8"))
             continue
 
         p = obj
-        if not para_has_content(p):
+        stripped = text.strip()
+        # Most paragraphs have text; only empty ones need the math check
+        if not stripped and not para_has_content(p, stripped):
             continue
 
+        if subtitle is None and not style_name.startswith("Heading"):
+            subtitle = stripped
+
         if skipped < skip_count:
             skipped += 1
             continue
 
         # Heading 1
-        if p.style.name.startswith("Heading"):
-            html_parts.append(f"<h1>{runs_to_html(p)}</h1>")
+        if style_name.startswith("Heading"):
+            write(b"<h1>%b</h1>" % runs_to_html(p, text).encode("utf-8"))
             continue
 
         # Numbered sub-section headings
-        text = p.text.strip()
-        if is_section_heading(p):
-            level = classify_heading_level(text)
-            content, _ = paragraph_to_html(p)
-            html_parts.append(f"<{level}>{content}</{level}>")
+        if is_section_heading(p, stripped, style_name):
+            level = classify_heading_level(stripped)
+            content, _ = paragraph_to_html(p, text)
+            write(_HEADING_HTML[level] % content.encode("utf-8"))
             continue
 
         # Regular paragraph (with potential math)
-        content, is_display_math = paragraph_to_html(p)
+        content, is_display_math = paragraph_to_html(p, text)
 
         if is_display_math:
             # Display math — wrap in a div, not a <p>
-            html_parts.append(f'<div class="math-display">{content}</div>')
+            write(b'<div class="math-display">%b</div>' % content.encode("utf-8"))
             has_math = True
         else:
             if "\\(" in content:
                 has_math = True
-            if text.startswith("\u2022") or text.startswith("- "):
-                html_parts.append(f'<p class="list-item">{content}</p>')
+            if stripped.startswith(_BULLET_PREFIXES):
+                write(b'<p class="list-item">%b</p>' % content.encode("utf-8"))
             else:
-                html_parts.append(f"<p>{content}</p>")
+                write(b"<p>%b</p>" % content.encode("utf-8"))
 
-    return "\n".join(html_parts), has_math
+    return has_math, subtitle
 
 
 # ── Chapter metadata ────────────────────────────────────────────────
@@ -778,14 +1056,40 @@ PARTS = {
     12: ("IV", "Meaning"), 13: ("IV", "Meaning"), 14: ("IV", "Meaning"),
 }
 
-NAV_ORDER = (["preface"] + [f"chapter-{i}" for i in range(15)]
-             + ["appendix-a", "appendix-b"])
+# Every content page, in navigation order:
+# (page_id, title, skip_count, with_subtitle)
+PAGES = (
+    [("preface", "Preface", 1, False)]
+    + [(f"chapter-{i}", f"Chapter {i}: {CHAPTER_TITLES[i]}", 2, True)
+       for i in range(15)]
+    + [("appendix-a", "Appendix A: Mathematical Constants", 2, False),
+       ("appendix-b", "Appendix B: Notation Reference", 2, False)]
+)
+
+NAV_ORDER = [page[0] for page in PAGES]
+
+# page_id -> output file path, joined once
+_PAGE_PATHS = {page_id: os.path.join(DOCS_DIR, f"{page_id}.html")
+               for page_id in NAV_ORDER}
 
 NAV_LABELS = {"preface": "Preface", "appendix-a": "Appendix A",
               "appendix-b": "Appendix B"}
 for i in range(15):
     NAV_LABELS[f"chapter-{i}"] = f"Chapter {i}"
 
+# page_id -> (prev_link, next_link) footer HTML
+NAV_NEIGHBORS = {}
+for i, page_id in enumerate(NAV_ORDER):
+    prev_link = ""
+    next_link = ""
+    if i > 0:
+        prev_id = NAV_ORDER[i - 1]
+        prev_link = f'<a href="{BASE_URL}/{prev_id}.html">&larr; {NAV_LABELS[prev_id]}</a>'
+    if i < len(NAV_ORDER) - 1:
+        next_id = NAV_ORDER[i + 1]
+        next_link = f'<a href="{BASE_URL}/{next_id}.html">{NAV_LABELS[next_id]} &rarr;</a>'
+    NAV_NEIGHBORS[page_id] = (prev_link, next_link)
+
 
 # ── HTML Templates ──────────────────────────────────────────────────
 
@@ -801,29 +1105,20 @@ KATEX_HEAD = f"""<link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/katex
   }});"></script>"""
 
 
-def page_html(title, body_content, page_id, subtitle=None, needs_math=False):
-    """Wrap body content in a full HTML page."""
-    idx = NAV_ORDER.index(page_id) if page_id in NAV_ORDER else -1
-    prev_link = ""
-    next_link = ""
-    if idx > 0:
-        prev_id = NAV_ORDER[idx - 1]
-        prev_link = f'<a href="{BASE_URL}/{prev_id}.html">&larr; {NAV_LABELS[prev_id]}</a>'
-    if 0 <= idx < len(NAV_ORDER) - 1:
-        next_id = NAV_ORDER[idx + 1]
-        next_link = f'<a href="{BASE_URL}/{next_id}.html">{NAV_LABELS[next_id]} &rarr;</a>'
-
-    subtitle_html = f'<p class="subtitle">{escape(subtitle)}</p>' if subtitle else ""
-    math_head = KATEX_HEAD if needs_math else ""
-
-    return f"""<!DOCTYPE html>
+# Invariant pieces of every content page, with BASE_URL filled in once.
+# page_chunks splices the per-page fields between them.
+_PAGE_HEAD = """<!DOCTYPE html>
 <html lang="en">
 <head>
 <meta charset="UTF-8">
 <meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>{escape(title)} — Ocean From Motion</title>
+<title>"""
+
+_PAGE_TITLE_END = f""" — Ocean From Motion</title>
 <link rel="stylesheet" href="{BASE_URL}/style.css">
-{math_head}
+"""
+
+_PAGE_MAIN_START = f"""
 </head>
 <body>
 <header>
@@ -836,41 +1131,75 @@ def page_html(title, body_content, page_id, subtitle=None, needs_math=False):
   </nav>
 </header>
 <main>
-  <h1 class="page-title">{escape(title)}</h1>
-  {subtitle_html}
-  {body_content}
+  <h1 class="page-title">"""
+
+_PAGE_NAV_PREV = """
 </main>
 <footer>
   <nav class="chapter-nav">
-    <div class="nav-prev">{prev_link}</div>
+    <div class="nav-prev">"""
+
+_PAGE_NAV_NEXT = f"""</div>
     <div class="nav-toc"><a href="{BASE_URL}/">Table of Contents</a></div>
-    <div class="nav-next">{next_link}</div>
+    <div class="nav-next">"""
+
+_PAGE_TAIL = """</div>
   </nav>
 </footer>
 </body>
 </html>
 """
 
+# The static head segments above, encoded once for page_chunks
+_PAGE_HEAD_BYTES = _PAGE_HEAD.encode("utf-8")
+_PAGE_TITLE_END_BYTES = _PAGE_TITLE_END.encode("utf-8")
+_KATEX_HEAD_BYTES = KATEX_HEAD.encode("utf-8")
+_PAGE_MAIN_START_BYTES = _PAGE_MAIN_START.encode("utf-8")
+
+# page_id -> complete page footer as UTF-8, prev/next links included. The
+# navigation order is fixed, so each footer is built and encoded once here.
+_PAGE_FOOTERS = {
+    page_id: "".join((_PAGE_NAV_PREV, prev_link, _PAGE_NAV_NEXT, next_link,
+                      _PAGE_TAIL)).encode("utf-8")
+    for page_id, (prev_link, next_link) in NAV_NEIGHBORS.items()
+}
+_PAGE_FOOTER_NO_NAV = (_PAGE_NAV_PREV + _PAGE_NAV_NEXT + _PAGE_TAIL).encode("utf-8")
+
+
+def page_chunks(title, body_parts, page_id, subtitle=None, needs_math=False):
+    """A full HTML page as a list of UTF-8 chunks, ready for a gather
+    write; neither the page nor its head is assembled as one string.
+    `body_parts` are the body's UTF-8 fragments, joined newline-separated."""
+    title_html = escape(title).encode("utf-8")
+    subtitle_html = (b'<p class="subtitle">%b</p>' % escape(subtitle).encode("utf-8")
+                     if subtitle else b"")
+    return [
+        _PAGE_HEAD_BYTES, title_html, _PAGE_TITLE_END_BYTES,
+        _KATEX_HEAD_BYTES if needs_math else b"", _PAGE_MAIN_START_BYTES,
+        title_html, b"</h1>\n  ", subtitle_html, b"\n  ",
+        b"\n".join(body_parts),
+        _PAGE_FOOTERS.get(page_id, _PAGE_FOOTER_NO_NAV),
+    ]
+
+
+# Table of contents entries for the cover page; all inputs are constants
+_toc_items = []
+_current_part = None
+for ch_num in range(15):
+    part_num, part_name = PARTS[ch_num]
+    part_key = f"PART {part_num}"
+    if part_key != _current_part:
+        _current_part = part_key
+        _toc_items.append(f'<li class="part-header">Part {part_num}: {part_name}</li>')
+    _toc_items.append(
+        f'<li><a href="{BASE_URL}/chapter-{ch_num}.html">'
+        f"Chapter {ch_num}: {CHAPTER_TITLES[ch_num]}</a></li>"
+    )
+_toc_items.append('<li class="part-header">Appendices</li>')
+_toc_items.append(f'<li><a href="{BASE_URL}/appendix-a.html">Appendix A: Mathematical Constants</a></li>')
+_toc_items.append(f'<li><a href="{BASE_URL}/appendix-b.html">Appendix B: Notation Reference</a></li>')
 
-def index_html():
-    """Generate the cover/index page."""
-    toc_items = []
-    current_part = None
-    for ch_num in range(15):
-        part_num, part_name = PARTS[ch_num]
-        part_key = f"PART {part_num}"
-        if part_key != current_part:
-            current_part = part_key
-            toc_items.append(f'<li class="part-header">Part {part_num}: {part_name}</li>')
-        toc_items.append(
-            f'<li><a href="{BASE_URL}/chapter-{ch_num}.html">'
-            f"Chapter {ch_num}: {CHAPTER_TITLES[ch_num]}</a></li>"
-        )
-    toc_items.append('<li class="part-header">Appendices</li>')
-    toc_items.append(f'<li><a href="{BASE_URL}/appendix-a.html">Appendix A: Mathematical Constants</a></li>')
-    toc_items.append(f'<li><a href="{BASE_URL}/appendix-b.html">Appendix B: Notation Reference</a></li>')
-
-    return f"""<!DOCTYPE html>
+_INDEX_HTML = f"""<!DOCTYPE html>
 <html lang="en">
 <head>
 <meta charset="UTF-8">
@@ -891,74 +1220,181 @@ def index_html():
     <h2>Contents</h2>
     <ol>
       <li><a href="{BASE_URL}/preface.html">Preface</a></li>
-      {"".join(toc_items)}
+      {"".join(_toc_items)}
     </ol>
   </nav>
 </main>
 </body>
 </html>
 """
+del _toc_items, _current_part
+
+
+def index_html():
+    """Return the cover/index page, built once at import."""
+    return _INDEX_HTML
 
 
 # ── Main ─────────────────────────────────────────────────────────────
 
+def write_chunks(path, chunks):
+    """Write byte chunks to `path` with a single gather write (os.writev)
+    where the OS has one, or one joined write otherwise. The data goes to
+    a temporary file that replaces `path` only once complete, so a killed
+    build never leaves a torn page behind."""
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            if hasattr(os, "writev"):
+                fd = f.fileno()
+                chunks = list(chunks)
+                while chunks:
+                    written = os.writev(fd, chunks)
+                    # A short write is legal; resume where it stopped
+                    while chunks and written >= len(chunks[0]):
+                        written -= len(chunks.pop(0))
+                    if written:
+                        chunks[0] = chunks[0][written:]
+            else:
+                f.write(b"".join(chunks))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def write_html(filename, html):
+    """Write a page into DOCS_DIR, encoding it to UTF-8 in one go."""
+    write_chunks(os.path.join(DOCS_DIR, filename), [html.encode("utf-8")])
+
+
+def copy_if_changed(src, dest):
+    """shutil.copy2 `src` to `dest` unless dest is already a copy of it:
+    copy2 preserves mtimes, so a matching size and mtime means unchanged.
+    Returns whether a copy was made."""
+    try:
+        s, d = os.stat(src), os.stat(dest)
+    except FileNotFoundError:
+        pass
+    else:
+        if s.st_size == d.st_size and s.st_mtime_ns == d.st_mtime_ns:
+            return False
+    # Copy beside dest and rename over it, like write_chunks
+    tmp = dest + ".tmp"
+    shutil.copy2(src, tmp)  # sendfile on Linux, fcopyfile on macOS
+    os.replace(tmp, dest)
+    return True
+
+
+# Section elements by page id. main() fills this before the worker pool
+# forks, so workers inherit the parsed document rather than receiving it
+# pickled (lxml elements cannot be pickled).
+_PAGE_SECTIONS = {}
+
+
+def render_page(job):
+    """Render one page job straight into its file in DOCS_DIR and return
+    the file's path. Runs in a worker process."""
+    page_id, title, skip_count, with_subtitle = job
+    # The <head> depends on has_math, so the body is rendered first
+    body_parts = []
+    has_math, subtitle = section_to_html(
+        _PAGE_SECTIONS[page_id], body_parts.append, skip_count=skip_count)
+    path = _PAGE_PATHS[page_id]
+    write_chunks(path, page_chunks(
+        title, body_parts, page_id,
+        subtitle=subtitle if with_subtitle else None, needs_math=has_math))
+    return path
+
+
+def _section_blob(section_elements):
+    """Picklable form of a section for workers that cannot inherit it:
+    its elements serialized as one XML blob, plus each element's
+    (type, text, style_name)."""
+    wrapper = etree.Element(_W_BODY, nsmap=section_elements[0][1].nsmap)
+    wrapper.extend(copy.deepcopy(obj) for _, obj, _, _ in section_elements)
+    etree.cleanup_namespaces(wrapper)
+    meta = [(etype, text, style_name)
+            for etype, _, text, style_name in section_elements]
+    return etree.tostring(wrapper), meta
+
+
+def render_blob_page(job):
+    """render_page for a job carrying its section as a _section_blob.
+    Runs in a spawned worker process."""
+    *page_job, (blob, meta) = job
+    elems = etree.fromstring(blob, _XML_PARSER)
+    _PAGE_SECTIONS[page_job[0]] = [
+        (etype, elem, text, style_name)
+        for (etype, text, style_name), elem in zip(meta, elems)]
+    return render_page(tuple(page_job))
+
+
+def render_pages(jobs):
+    """Render page jobs in parallel across worker processes. Forked
+    workers inherit the parsed sections; where fork is unavailable, each
+    job ships its section to a spawned worker as serialized XML.
+    Returns the paths written."""
+    # Biggest sections first, so a long chapter doesn't start last and
+    # leave the other workers idle while it finishes
+    jobs = sorted(jobs, key=lambda job: len(_PAGE_SECTIONS[job[0]]),
+                  reverse=True)
+    try:
+        ctx = multiprocessing.get_context("fork")
+    except ValueError:
+        blob_jobs = [job + (_section_blob(_PAGE_SECTIONS[job[0]]),)
+                     for job in jobs]
+        with ProcessPoolExecutor() as ex:
+            return list(ex.map(render_blob_page, blob_jobs))
+    with ProcessPoolExecutor(mp_context=ctx) as ex:
+        return list(ex.map(render_page, jobs))
+
+
 def main():
+    # Progress lines are collected and printed in one write at the end (or
+    # when a step fails), rather than one print per page
+    log = []
+    try:
+        build(log)
+    finally:
+        if log:
+            print("\n".join(log))
+
+
+def build(log):
+    """Convert the .docx into DOCS_DIR, appending progress lines to `log`."""
     os.makedirs(DOCS_DIR, exist_ok=True)
 
-    print("Reading .docx ...")
-    doc = Document(DOCX_PATH)
-    elements = parse_document(doc)
-    sections = split_into_sections(elements)
+    log.append("Reading .docx ...")
+    elements = parse_document(DOCX_PATH)
+    preface, chapters, appendix_a, appendix_b = split_into_sections(elements)
 
     # Index
-    print("Writing index.html")
-    with open(os.path.join(DOCS_DIR, "index.html"), "w", encoding="utf-8") as f:
-        f.write(index_html())
-
-    # Preface
-    print("Writing preface.html")
-    preface_body, preface_math = section_to_html(sections["preface"], skip_count=1)
-    with open(os.path.join(DOCS_DIR, "preface.html"), "w", encoding="utf-8") as f:
-        f.write(page_html("Preface", preface_body, "preface", needs_math=preface_math))
-
-    # Chapters
-    for ch_num in range(15):
-        key = f"chapter-{ch_num}"
-        print(f"Writing {key}.html")
-        if key not in sections:
-            print(f"  WARNING: {key} not found!")
+    log.append("Writing index.html")
+    write_html("index.html", index_html())
+
+    # Preface, chapters and appendices, in PAGES order
+    jobs = []
+    sections = [preface, *chapters, appendix_a, appendix_b]
+    for job, section_elements in zip(PAGES, sections):
+        page_id = job[0]
+        log.append(f"Writing {page_id}.html")
+        if section_elements is None:
+            log.append(f"  WARNING: {page_id} not found!")
             continue
+        _PAGE_SECTIONS[page_id] = section_elements
+        jobs.append(job)
 
-        ch_elements = sections[key]
-        subtitle = None
-        for etype, obj in ch_elements:
-            if etype == "paragraph" and not obj.style.name.startswith("Heading"):
-                if para_has_content(obj):
-                    subtitle = obj.text.strip()
-                    break
-
-        body, has_math = section_to_html(ch_elements, skip_count=2)
-        title = f"Chapter {ch_num}: {CHAPTER_TITLES[ch_num]}"
-
-        with open(os.path.join(DOCS_DIR, f"{key}.html"), "w", encoding="utf-8") as f:
-            f.write(page_html(title, body, key, subtitle=subtitle, needs_math=has_math))
-
-    # Appendices
-    for app_key, app_title in [("appendix-a", "Appendix A: Mathematical Constants"),
-                                ("appendix-b", "Appendix B: Notation Reference")]:
-        print(f"Writing {app_key}.html")
-        if app_key not in sections:
-            print(f"  WARNING: {app_key} not found!")
-            continue
-        app_body, app_math = section_to_html(sections[app_key], skip_count=2)
-        with open(os.path.join(DOCS_DIR, f"{app_key}.html"), "w", encoding="utf-8") as f:
-            f.write(page_html(app_title, app_body, app_key, needs_math=app_math))
+    render_pages(jobs)
 
     # Copy .docx
     dest = os.path.join(DOCS_DIR, "Ocean_From_Motion.docx")
-    shutil.copy2(DOCX_PATH, dest)
-    print(f"Copied .docx to {dest}")
-    print("Done!")
+    if copy_if_changed(DOCX_PATH, dest):
+        log.append(f"Copied .docx to {dest}")
+    else:
+        log.append(f".docx at {dest} is up to date")
+    log.append("Done!")
 
 
 if __name__ == "__main__":